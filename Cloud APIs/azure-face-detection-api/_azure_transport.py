@@ -0,0 +1,21 @@
+import httpx
+
+
+def create_client():
+    """
+    Creates the HTTP client used to call the Azure Face REST API.
+
+    The client negotiates HTTP/2, so a whole batch of concurrent detections is
+    multiplexed over a single TLS connection instead of opening one socket (and
+    paying one handshake) per in-flight request. The limits cap how many
+    connections are opened if the server falls back to HTTP/1.1.
+
+    Use it as an async context manager so the client is closed when the batch is
+    done.
+
+    :return: An httpx.AsyncClient configured for HTTP/2 with a small connection pool.
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=8),
+    )
@@ -1,28 +1,93 @@
+import atexit
+import functools
+import json
 import os
-from dataclasses import dataclass
+from typing import NamedTuple
 
 import click
-from PIL import Image, ExifTags
+import orjson
+import requests
 from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import RequestsTransport
 from azure.maps.search import MapsSearchClient
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
-# Load the environment variables from the .env file
-load_dotenv()
+# Deserialize API responses with orjson instead of the stdlib parser: the Azure SDK
+# resolves json.loads at call time, so pointing it at the faster Rust implementation
+# speeds up parsing of geocoding results. Calls using keyword arguments that orjson
+# does not support still go to the stdlib implementation.
+_stdlib_json_loads = json.loads
 
-# Stores the Azure Maps subscription key into a variable for later use
-subscription_key = os.environ['AZURE_MAPS_KEY']
 
+def _fast_json_loads(s, *args, **kwargs):
+    if args or kwargs:
+        return _stdlib_json_loads(s, *args, **kwargs)
+    return orjson.loads(s)
 
-@dataclass
-class GPSCoordinate:
+
+json.loads = _fast_json_loads
+
+@functools.cache
+def _subscription_key() -> str:
+    """
+    Returns the Azure Maps subscription key, read from the environment on first use.
+
+    The .env file is only loaded (a filesystem walk) when the variable is not already
+    set, so deployments that inject their configuration directly skip that cost.
+    """
+
+    if 'AZURE_MAPS_KEY' not in os.environ:
+        load_dotenv()
+    return os.environ['AZURE_MAPS_KEY']
+
+# A single requests.Session backs every Azure client created by this script.
+# The mounted HTTPAdapter keeps a pool of reusable keep-alive connections, so
+# repeated geocoding calls do not need to open a new socket each time.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=32))
+
+# session_owner=False keeps the shared session open even if a client using the
+# transport is closed.
+_transport = RequestsTransport(session=_session, session_owner=False)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_maps_client() -> MapsSearchClient:
+    """
+    Creates the MapsSearchClient used for reverse geocoding.
+
+    The client is created only once and then reused for every call, so repeated
+    geocoding requests keep using the same warm connections from the shared pool
+    instead of paying a TLS handshake each time.
+
+    :return: A shared MapsSearchClient instance.
+    """
+    return MapsSearchClient(AzureKeyCredential(_subscription_key()), transport=_transport)
+
+
+def _close_maps_client():
+    """
+    Closes the shared MapsSearchClient on exit, but only if one was actually created.
+    """
+    if _get_maps_client.cache_info().currsize > 0:
+        _get_maps_client().close()
+        _session.close()
+
+
+# Makes sure the shared client and session release their connections when the program exits.
+atexit.register(_close_maps_client)
+
+
+class GPSCoordinate(NamedTuple):
     """
     Represents a GPS coordinate in degrees, minutes, seconds, and direction format.
 
     This class encapsulates the representation of a geographical coordinate using
-    its degrees, minutes, seconds, and cardinal direction. It provides a method
-    to convert the coordinate into its decimal format for easier computation or
-    representation.
+    its degrees, minutes, seconds, and cardinal direction. It is only used for
+    display; the decimal conversion used for geocoding works on the raw tuples via
+    _dms_to_decimal. Being a NamedTuple, instances are plain immutable tuples with
+    no per-instance __dict__, which keeps them cheap to build in long batch runs.
 
     :ivar degrees: The degree component of the GPS coordinate.
     :type degrees: float
@@ -44,77 +109,306 @@ class GPSCoordinate:
     def __str__(self):
         return f"{self.degrees}° {self.minutes}' {self.seconds}\" {self.direction}"
 
-    def to_decimal(self):
-        """
-        Converts the GPS coordinate into its decimal format.
-        :return: The decimal representation of the GPS coordinate.
-        """
-        return float(self.degrees + self.minutes / 60 + self.seconds / 3600) * (
-            -1 if self.direction in ['S', 'W'] else 1)
 
+def _dms_to_decimal(dms, ref) -> float:
+    """
+    Converts a (degrees, minutes, seconds) tuple and its reference into a decimal value.
+
+    Working on the raw tuple keeps the conversion a single arithmetic expression, with
+    no intermediate objects built on the way.
 
-@dataclass
-class GPSLocation:
+    :param dms: A (degrees, minutes, seconds) tuple.
+    :param ref: The cardinal direction of the coordinate ('N', 'S', 'E', 'W').
+    :return: The decimal representation of the coordinate, negative for 'S' and 'W'.
+    """
+
+    degrees, minutes, seconds = dms
+    value = float(degrees) + float(minutes) / 60 + float(seconds) / 3600
+    return -value if ref in ('S', 'W') else value
+
+
+class GPSLocation(NamedTuple):
     """
     Represents a geographical location specified by latitude and longitude.
 
     This class is used to store and manage latitude and longitude
-    coordinates encapsulated by the GPSCoordinate type.
+    coordinates encapsulated by the GPSCoordinate type, alongside their
+    decimal form, which is computed once at extraction time.
 
     :ivar latitude: Represents the latitude of the location.
     :type latitude: GPSCoordinate
     :ivar longitude: Represents the longitude of the location.
     :type longitude: GPSCoordinate
+    :ivar latitude_decimal: The latitude in decimal degrees.
+    :type latitude_decimal: float
+    :ivar longitude_decimal: The longitude in decimal degrees.
+    :type longitude_decimal: float
     """
     latitude: GPSCoordinate
     longitude: GPSCoordinate
+    latitude_decimal: float
+    longitude_decimal: float
 
 
-def _get_gps_location(img: Image.Image) -> GPSLocation | None:
+def _get_gps_location(img_path: str) -> GPSLocation | None:
     """
     Extracts the GPS location from the EXIF data of an image.
-    :param img: The image to extract the GPS location from.
+
+    Results are cached per (path, modification time), so asking again for the same
+    unchanged file (e.g. on a retry) does not parse the image a second time.
+
+    :param img_path: The path of the image to extract the GPS location from.
     :return: A GPSLocation object containing the latitude and longitude of the image; None if no GPS data is found.
     """
 
-    # Check if the image has EXIF data
-    exif_data = img.getexif()
-    if exif_data is None:
-        return None
+    return _get_gps_location_cached(img_path, os.path.getmtime(img_path))
 
-    # Extract the GPS information from the EXIF data
-    gps_info = exif_data.get_ifd(ExifTags.IFD.GPSInfo)
-    if gps_info is None:
-        return None
 
-    lat = gps_info.get(ExifTags.GPS.GPSLatitude)            # (degrees, minutes, seconds)
-    lat_ref = gps_info.get(ExifTags.GPS.GPSLatitudeRef)     # N or S
-    lon = gps_info.get(ExifTags.GPS.GPSLongitude)           # (degrees, minutes, seconds)
-    lon_ref = gps_info.get(ExifTags.GPS.GPSLongitudeRef)    # E or W
+@functools.lru_cache(maxsize=128)
+def _get_gps_location_cached(img_path: str, mtime: float) -> GPSLocation | None:
+    """
+    Does the actual EXIF parsing for _get_gps_location.
+
+    The mtime parameter is only there to be part of the cache key: if the file changes,
+    its modification time changes and the stale cached value is not reused.
+
+    :param img_path: The path of the image to extract the GPS location from.
+    :param mtime: The modification time of the file at img_path.
+    :return: A GPSLocation object containing the latitude and longitude of the image; None if no GPS data is found.
+    """
+
+    try:
+        # Fast path: scan the JPEG markers ourselves and stop as soon as the GPS
+        # tags are read, without ever constructing an Image object.
+        gps = _read_gps_fast(img_path)
+    except ValueError:
+        # The file is not a JPEG this scanner understands (different format, or the
+        # EXIF block lives beyond the chunk we read); let Pillow handle it instead.
+        gps = _read_gps_pillow(img_path)
 
     # If any of the GPS data is missing, return None
-    if None in (lat, lon, lat_ref, lon_ref):
+    if gps is None:
         return None
 
+    lat, lat_ref, lon, lon_ref = gps
+
+    # The GPSCoordinate objects are only built for display; the decimal values used
+    # for geocoding come straight from the raw tuples.
     longitude = GPSCoordinate(lon[0], lon[1], lon[2], lon_ref)
     latitude = GPSCoordinate(lat[0], lat[1], lat[2], lat_ref)
 
-    return GPSLocation(latitude, longitude)
+    return GPSLocation(latitude, longitude,
+                       latitude_decimal=_dms_to_decimal(lat, lat_ref),
+                       longitude_decimal=_dms_to_decimal(lon, lon_ref))
+
+
+# Every JPEG EXIF block starts with this signature, right after the APP1 marker size.
+_EXIF_SIGNATURE = b'Exif\x00\x00'
+
+# The EXIF tags we care about, as defined by the EXIF GPS IFD layout.
+_TAG_GPS_IFD_POINTER = 0x8825
+_TAG_GPS_LATITUDE_REF = 0x0001
+_TAG_GPS_LATITUDE = 0x0002
+_TAG_GPS_LONGITUDE_REF = 0x0003
+_TAG_GPS_LONGITUDE = 0x0004
+
+
+def _read_gps_fast(img_path: str):
+    """
+    Reads the GPS EXIF tags of a JPEG file with a minimal hand-rolled parser.
+
+    Only the first 64 KB of the file are read (EXIF must live in the APP1 segment,
+    which the standard caps at 64 KB and which appears before any image data), and
+    parsing stops as soon as the four GPS tags are extracted. This avoids importing
+    and running a full image library just to read a handful of metadata bytes.
+
+    :param img_path: The path of the JPEG file to read.
+    :return: A tuple (lat, lat_ref, lon, lon_ref) where lat/lon are (degrees, minutes,
+        seconds) tuples; None if the file has no GPS data.
+    :raises ValueError: If the file cannot be handled by this parser.
+    """
+
+    with open(img_path, 'rb') as f:
+        data = f.read(65536)
+
+    # A JPEG file always starts with the SOI (start of image) marker.
+    if not data.startswith(b'\xff\xd8'):
+        raise ValueError('not a JPEG file')
+
+    # Walk the JPEG segments looking for APP1 (0xFFE1), which holds the EXIF block.
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            raise ValueError('corrupt JPEG marker stream')
+
+        marker = data[offset + 1]
+        if marker == 0xDA:
+            # Start of scan: actual image data begins here, so there is no EXIF block.
+            return None
+
+        size = int.from_bytes(data[offset + 2:offset + 4], 'big')
+        segment_end = offset + 2 + size
+        if marker == 0xE1 and data[offset + 4:offset + 10] == _EXIF_SIGNATURE:
+            if segment_end > len(data):
+                raise ValueError('EXIF segment is beyond the bytes we read')
+            # The TIFF structure with the actual tags starts right after the signature.
+            return _parse_tiff_gps(data[offset + 10:segment_end])
+
+        offset = segment_end
+
+    # Ran out of buffer before finding APP1 or the image data.
+    raise ValueError('truncated JPEG header')
+
+
+def _parse_tiff_gps(tiff: bytes):
+    """
+    Extracts the GPS tags from the TIFF structure embedded in a JPEG APP1 segment.
+
+    The structure is a TIFF header (byte order + offset of the first IFD), followed by
+    IFDs made of 12-byte entries. The GPS data lives in a sub-IFD pointed to by tag
+    0x8825 of the first IFD.
+
+    :param tiff: The TIFF bytes, starting at the byte-order mark.
+    :return: A tuple (lat, lat_ref, lon, lon_ref); None if there is no GPS IFD or it
+        is incomplete.
+    :raises ValueError: If the TIFF structure cannot be parsed.
+    """
+
+    if len(tiff) < 8:
+        raise ValueError('TIFF header too short')
+
+    # The first two bytes select the byte order for every number that follows.
+    if tiff[:2] == b'II':
+        byteorder = 'little'
+    elif tiff[:2] == b'MM':
+        byteorder = 'big'
+    else:
+        raise ValueError('bad TIFF byte order mark')
+
+    def read_int(pos, length):
+        chunk = tiff[pos:pos + length]
+        if len(chunk) != length:
+            raise ValueError('TIFF offset beyond the bytes we read')
+        return int.from_bytes(chunk, byteorder)
+
+    def read_entries(ifd_offset):
+        # An IFD is an entry count followed by 12-byte entries:
+        # tag (2 bytes), type (2 bytes), count (4 bytes), value or offset (4 bytes).
+        count = read_int(ifd_offset, 2)
+        for i in range(count):
+            entry = ifd_offset + 2 + i * 12
+            yield read_int(entry, 2), entry + 8
+
+    def read_rationals(value_offset):
+        # Rational values never fit in the 4-byte value field, so it holds the offset
+        # of the actual data: (numerator, denominator) pairs of 4 bytes each.
+        data_offset = read_int(value_offset, 4)
+        values = []
+        for i in range(3):
+            numerator = read_int(data_offset + i * 8, 4)
+            denominator = read_int(data_offset + i * 8 + 4, 4)
+            values.append(numerator / denominator if denominator else 0.0)
+        return tuple(values)
+
+    # Find the pointer to the GPS sub-IFD in the first IFD.
+    gps_ifd_offset = None
+    for tag, value_offset in read_entries(read_int(4, 4)):
+        if tag == _TAG_GPS_IFD_POINTER:
+            gps_ifd_offset = read_int(value_offset, 4)
+            break
+
+    if gps_ifd_offset is None:
+        return None
+
+    # Collect the four GPS tags from the sub-IFD.
+    lat = lat_ref = lon = lon_ref = None
+    for tag, value_offset in read_entries(gps_ifd_offset):
+        if tag == _TAG_GPS_LATITUDE:
+            lat = read_rationals(value_offset)
+        elif tag == _TAG_GPS_LONGITUDE:
+            lon = read_rationals(value_offset)
+        elif tag == _TAG_GPS_LATITUDE_REF:
+            # References are ASCII values ('N'/'S'/'E'/'W') stored inline.
+            lat_ref = chr(tiff[value_offset])
+        elif tag == _TAG_GPS_LONGITUDE_REF:
+            lon_ref = chr(tiff[value_offset])
+
+    if None in (lat, lon, lat_ref, lon_ref):
+        return None
+
+    return lat, lat_ref, lon, lon_ref
+
+
+def _read_gps_pillow(img_path: str):
+    """
+    Reads the GPS EXIF tags of an image using Pillow.
+
+    This is the fallback for formats the fast JPEG scanner does not understand; Pillow
+    is imported here, on first use, so the common JPEG path never pays its import cost.
+
+    :param img_path: The path of the image to read.
+    :return: A tuple (lat, lat_ref, lon, lon_ref) where lat/lon are (degrees, minutes,
+        seconds) tuples; None if the image has no GPS data.
+    """
+
+    from PIL import Image, ExifTags
+
+    # Image.open only parses the headers; since we stop at the EXIF metadata and never
+    # touch the pixels, the (much more expensive) image decode never happens.
+    with Image.open(img_path) as img:
+        exif_data = img.getexif()
+        if exif_data is None:
+            return None
+
+        # Extract the GPS information from the EXIF data
+        gps_info = exif_data.get_ifd(ExifTags.IFD.GPSInfo)
+        if gps_info is None:
+            return None
+
+        lat = gps_info.get(ExifTags.GPS.GPSLatitude)            # (degrees, minutes, seconds)
+        lat_ref = gps_info.get(ExifTags.GPS.GPSLatitudeRef)     # N or S
+        lon = gps_info.get(ExifTags.GPS.GPSLongitude)           # (degrees, minutes, seconds)
+        lon_ref = gps_info.get(ExifTags.GPS.GPSLongitudeRef)    # E or W
+
+    # If any of the GPS data is missing, return None
+    if None in (lat, lon, lat_ref, lon_ref):
+        return None
+
+    return lat, lat_ref, lon, lon_ref
 
 
 def _search_address(location: GPSLocation) -> str | None:
     """
     Searches for the address of a given GPS location using Azure Maps.
+
+    Coordinates are rounded to 5 decimals (about one meter) before the lookup, so
+    photos taken at the same spot hit the cache instead of repeating the API call.
+
     :param location: The GPS location to search for.
     :return: The formatted address of the location; None if no address is found.
     """
 
-    # Creates a MapsSearchClient instance using the Azure Maps subscription key.
-    maps_search_client = MapsSearchClient(AzureKeyCredential(subscription_key))
+    return _search_address_cached(round(location.longitude_decimal, 5),
+                                  round(location.latitude_decimal, 5))
+
+
+@functools.lru_cache(maxsize=1024)
+def _search_address_cached(longitude: float, latitude: float) -> str | None:
+    """
+    Does the actual reverse geocoding for _search_address.
+
+    Every distinct (longitude, latitude) pair is only ever sent to the API once per
+    run; repeats are answered from the cache.
+
+    :param longitude: The longitude to search for, in decimal degrees.
+    :param latitude: The latitude to search for, in decimal degrees.
+    :return: The formatted address of the location; None if no address is found.
+    """
 
-    # Performs reverse geocoding to retrieve the address of the given GPS location.
-    result = maps_search_client.get_reverse_geocoding(
-        coordinates=[location.longitude.to_decimal(), location.latitude.to_decimal()])
+    # Performs reverse geocoding to retrieve the address of the given GPS location,
+    # reusing the shared MapsSearchClient.
+    result = _get_maps_client().get_reverse_geocoding(
+        coordinates=[longitude, latitude])
 
     # If there are no location features in the result, return None.
     if 'features' not in result:
@@ -146,8 +440,7 @@ def get_address(img_path: str):
     :return: None
     """
 
-    image = Image.open(img_path)
-    location = _get_gps_location(image)
+    location = _get_gps_location(img_path)
 
     if location is None:
         print("No se encontraron datos GPS en la imagen.")
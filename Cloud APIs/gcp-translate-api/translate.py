@@ -1,39 +1,72 @@
+import functools
+
 import click
 from google.cloud import translate_v2 as translate
 import os
 
-# Loads the credentials from the credentials.json file into the GOOGLE_APPLICATION_CREDENTIALS environment variable.
-os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'credentials.json'
+
+@functools.lru_cache(maxsize=1)
+def _get_translate_client():
+    """
+    Creates the client used to interact with GCP Translate API.
+
+    This will use the credentials referenced by the GOOGLE_APPLICATION_CREDENTIALS environment
+    variable, which falls back to the local credentials.json file when not already set (so a
+    deployment that provides its own credentials is untouched). The client is created only once
+    and then reused, so every request goes through the same underlying connection instead of
+    opening a new one per call.
+
+    :return: A shared Translate API client instance.
+    """
+
+    # Points GOOGLE_APPLICATION_CREDENTIALS at the credentials.json file unless it is already set.
+    os.environ.setdefault('GOOGLE_APPLICATION_CREDENTIALS', 'credentials.json')
+    return translate.Client()
+
+
+# Maximum number of texts the Translate API accepts in a single request.
+_BATCH_SIZE = 128
 
 
 @click.command()
-@click.argument('text')
+@click.argument('text', required=False)
 @click.option('--target', '-t', default='es', help='Target language to translate the text')
-def translate_cmd(text, target):
+@click.option('--file', '-f', 'input_file', type=click.Path(exists=True),
+              help='File with one text to translate per line, translated as a batch')
+def translate_cmd(text, target, input_file):
     """
-    This function uses the Google Cloud Translate API to translate a given text to a target language.
-    :param text: The source text to translate. This is mandatory.
+    This function uses the Google Cloud Translate API to translate one or more texts to a target language.
+    :param text: The source text to translate. Either this or --file must be given.
     :param target: The target language to translate the text. This is optional and defaults to 'es' (Spanish).
+    :param input_file: A file with one source text per line. Packing many texts into a single API
+        request avoids paying one round trip per text.
     """
 
-    # Creates a new API client to interact with GCP Translate API.
-    # This will use the credentials loaded in the GOOGLE_APPLICATION_CREDENTIALS environment variable.
-    translate_client = translate.Client()
+    if input_file is not None:
+        # Reads the texts to translate from the file, one per line, skipping empty lines.
+        with open(input_file, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+    elif text is not None:
+        texts = [text]
+    else:
+        raise click.UsageError('Either TEXT or --file must be provided.')
 
-    # Uses Translate API to detect the language of the input text.
-    # The result is an object containing the original input text, the detected language code and confidence score.
-    detect_lang_res = translate_client.detect_language(text)
+    translate_client = _get_translate_client()
 
-    # Display a user-friendly message with the detected language and confidence score.
-    print(f"Lenguaje detectado: '{detect_lang_res['language']}' [confianza: {detect_lang_res['confidence']:0.2%}]")
+    # The API accepts up to _BATCH_SIZE texts per request, so a file with N lines needs
+    # only ceil(N / _BATCH_SIZE) round trips instead of N.
+    for start in range(0, len(texts), _BATCH_SIZE):
+        batch = texts[start:start + _BATCH_SIZE]
 
-    # Uses the Translate API to translate the input text to the target language (spanish by default).
-    # The result is an object containing the original input text, the translated text and the detected source language.
-    # The detected source language is the same as the one detected in the previous step.
-    translation_res = translate_client.translate(text, target_language=target)
+        # Uses the Translate API to translate the batch to the target language (spanish by default).
+        # Each result is an object containing the original input text, the translated text and the
+        # detected source language, so a single round trip covers both detection and translation.
+        translation_res = translate_client.translate(batch, target_language=target)
 
-    # Display a user-friendly message with the translated text.
-    print(f"Traducción a '{target}': {translation_res['translatedText']}")
+        # Display a user-friendly message with the detected language and translation of each text.
+        for res in translation_res:
+            print(f"[{res['detectedSourceLanguage']}] {res['input']}")
+            print(f"Traducción a '{target}': {res['translatedText']}")
 
 
 if __name__ == '__main__':